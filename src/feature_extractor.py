@@ -1,50 +1,178 @@
+import itertools
 import re
+import sys
 import fitz # PyMuPDF
-from collections import Counter
+import numpy as np
+from functools import lru_cache
+
+# Common indicators for bold/heavy fonts (works across many scripts) and for
+# italic/oblique fonts, fused so a single scan of the font name yields both.
+# The alternation sits inside a lookahead so a bold token never consumes the
+# start of an italic one (e.g. "demi" + "it").
+_STYLE_RE = re.compile(
+    r"(?=(?P<b>bold|black|heavy|demi|semibold|extrabold|bd)|(?P<i>italic|oblique|it))",
+    re.IGNORECASE
+)
+
+# Pattern for various numbering schemes:
+# 1. / 1.1.2 / (1) / [1]
+# A. / B)
+# a. / b)
+# Roman numerals: I., i.
+# Full-width numbers: １. / １．１
+# Common bullet characters: •, *, -, –, —
+_NUMBERING_RE = re.compile(
+    r"^\s*("
+    r"(\d+\.)+\d*|"      # 1., 1.1, 1.1.1
+    r"\(\d+\)|\[\d+\]|"   # (1), [1]
+    r"([A-Z]\.|[a-z]\.)\s|" # A. or a. followed by a space
+    r"[A-Z]\)|[a-z]\)|"      # A) or a)
+    r"(?:[IVXLCDM]+\.|[ivxlcdm]+\.)|" # I. or i.
+    r"[０-９]+(\．[０-９]+)*|" # Full-width numbers for CJK
+    r"[\u2022\u00B7\u2023\u25CF\u25E6\u25CB\u25D8\u25D9\u25BA\u25C4\u2043\u25AA\u25AC\u25C9\u2605\*—\-–+]" # Comprehensive bullet characters
+    r")\s*", re.UNICODE
+)
+
+@lru_cache(maxsize=512)
+def classify_font(font_name: str) -> tuple:
+    """Returns (is_bold, is_italic) for a font name in a single regex pass."""
+    bold = italic = False
+    for match in _STYLE_RE.finditer(font_name):
+        if match.lastgroup == 'b':
+            bold = True
+        else:
+            italic = True
+        if bold and italic:
+            break
+    return bold, italic
 
 def is_bold(font_name: str) -> bool:
     """Checks if a font name suggests a bold weight, robust for multilingual fonts."""
-    # Common indicators for bold/heavy fonts, works across many scripts
-    return any(val in font_name.lower() for val in ['bold', 'black', 'heavy', 'demi', 'semibold', 'extrabold', 'bd'])
+    return classify_font(font_name)[0]
 
 def is_italic(font_name: str) -> bool:
     """Checks if a font name suggests an italic or oblique style."""
-    return any(val in font_name.lower() for val in ['italic', 'oblique', 'it'])
+    return classify_font(font_name)[1]
 
 def starts_with_numbering_or_bullet(text: str) -> bool:
     """
     Checks if a string starts with common numbering (1., 1.1, A., a., i., I.) or bullet patterns.
     Extended to include full-width numbers, Roman numerals, and basic bullet points.
     """
-    # Pattern for various numbering schemes:
-    # 1. / 1.1.2 / (1) / [1]
-    # A. / B)
-    # a. / b)
-    # Roman numerals: I., i.
-    # Full-width numbers: １. / １．１
-    # Common bullet characters: •, *, -, –, —
-    pattern = re.compile(
-        r"^\s*("
-        r"(\d+\.)+\d*|"      # 1., 1.1, 1.1.1
-        r"\(\d+\)|\[\d+\]|"   # (1), [1]
-        r"([A-Z]\.|[a-z]\.)\s|" # A. or a. followed by a space
-        r"[A-Z]\)|[a-z]\)|"      # A) or a)
-        r"(?:[IVXLCDM]+\.|[ivxlcdm]+\.)|" # I. or i.
-        r"[０-９]+(\．[０-９]+)*|" # Full-width numbers for CJK
-        r"[\u2022\u00B7\u2023\u25CF\u25E6\u25CB\u25D8\u25D9\u25BA\u25C4\u2043\u25AA\u25AC\u25C9\u2605\*—\-–+]" # Comprehensive bullet characters
-        r")\s*", re.UNICODE
-    )
-    return bool(pattern.match(text))
+    return _NUMBERING_RE.match(text) is not None
 
 def is_centered(line_bbox: fitz.Rect, page_width: float, tolerance_ratio: float = 0.05) -> bool:
     """
     Checks if a line is approximately centered on the page.
     Tolerance ratio determines how far from the true center it can be.
+    extract_features inlines this test per page; this helper is kept for
+    external callers.
     """
     line_center_x = (line_bbox.x0 + line_bbox.x1) / 2
     page_center_x = page_width / 2
     return abs(page_center_x - line_center_x) < (page_width * tolerance_ratio)
 
+def _features_for_page(page):
+    """
+    Computes the feature vectors for every text line of a single page.
+    """
+    page_number = page["page_number"]
+    page_width = page["page_rect"].width
+    page_height = page["page_rect"].height 
+    # Page-constant half-width of the band a line's midpoint must fall in to
+    # count as centered (see is_centered).
+    half_tol = page_width * 0.05
+
+    # Per-page geometry, kept column-wise so the derived layout features
+    # can be computed in one vectorized pass once the page is read.
+    page_features = []
+    texts, x0s, x1s, y0s, y1s = [], [], [], [], []
+
+    blocks = [b for b in page.get("blocks", []) if b.get("type") == 0]
+    blocks.sort(key=lambda b: (b.get("bbox", (0,0,0,0))[1], b.get("bbox", (0,0,0,0))[0]))
+
+    for block in blocks:
+        lines = sorted(block.get("lines", []), key=lambda l: l.get("bbox", (0,0,0,0))[1])
+        
+        for line in lines:
+            spans = line.get("spans")
+            if not spans:
+                continue
+
+            line_text = "".join([span["text"] for span in spans]).strip()
+            if not line_text:
+                continue
+
+            # Most frequent (rounded) span size; ties go to the first seen
+            size_freq = {}
+            for s in spans:
+                size = round(s["size"], 1)
+                size_freq[size] = size_freq.get(size, 0) + 1
+            dominant_font_size = max(size_freq.items(), key=lambda kv: kv[1])[0]
+
+            is_line_bold = is_line_italic = False
+            for span in spans:
+                span_bold, span_italic = classify_font(span["font"])
+                is_line_bold |= span_bold
+                is_line_italic |= span_italic
+                if is_line_bold and is_line_italic:
+                    break
+            
+            # A document uses only a handful of fonts; interning lets all of its
+            # lines share one string per font name.
+            first_span_font_name = sys.intern(spans[0]["font"])
+            
+            font_color = spans[0].get("color", 0)
+
+            x0, y0, x1, y1 = line["bbox"]
+            
+            feature_vector = {
+                "text": line_text,
+                "page_number": page_number,
+                "bbox": line["bbox"],
+                "font_size": dominant_font_size,
+                "font_name": first_span_font_name,
+                "font_color": font_color,
+                "is_bold": is_line_bold,
+                "is_italic": is_line_italic,
+                "is_all_caps": line_text.isupper() and any(c.isalpha() for c in line_text),
+                "starts_with_pattern": False, # filled in by the page pass below
+                "text_length": len(line_text),
+                "word_count": len(line_text.split()),
+                "is_centered": False, # filled in by the page pass below
+                "space_above": 0.0, # filled in by the page pass below
+                "x0": x0,
+                "y0": y0,
+                "page_height": page_height,
+                "block_id": block.get("number")
+            }
+            page_features.append(feature_vector)
+            texts.append(line_text)
+            x0s.append(x0)
+            x1s.append(x1)
+            y0s.append(y0)
+            y1s.append(y1)
+
+    if not page_features:
+        return page_features
+
+    line_x0 = np.asarray(x0s)
+    line_x1 = np.asarray(x1s)
+    line_y0 = np.asarray(y0s)
+    # Bottom edge of the previous line on the page; the first line has none.
+    prev_y1 = np.concatenate(([0.0], np.asarray(y1s[:-1])))
+
+    centered = np.abs(line_x0 + line_x1 - page_width) * 0.5 < half_tol
+    space_above = np.where(prev_y1 > 0, line_y0 - prev_y1, 0.0)
+    # One C-level map of the anchored pattern over the whole page's lines
+    numbered = map(_NUMBERING_RE.match, texts)
+
+    for feature_vector, line_centered, line_space, line_match in zip(page_features, centered.tolist(), space_above.tolist(), numbered):
+        feature_vector["is_centered"] = line_centered
+        feature_vector["space_above"] = line_space
+        feature_vector["starts_with_pattern"] = line_match is not None
+    return page_features
+
 def extract_features(pages_data):
     """
     Processes raw page data to extract a rich feature vector for each text line.
@@ -52,73 +180,10 @@ def extract_features(pages_data):
     aggregates text lines, and computes a set of features for each line
     that can be used to classify it as a heading or body text.
     Args:
-        pages_data: The list of page dictionaries from pdf_parser.
+        pages_data: The page dictionaries from pdf_parser, either as a list or
+            as the lazy page iterator process_pdf returns.
     Returns:
         A list of dictionaries, where each dictionary is a feature vector
         for a text line.
     """
-    all_lines_features = []
-
-    for page_idx, page in enumerate(pages_data):
-        page_number = page["page_number"]
-        page_width = page["page_rect"].width
-        page_height = page["page_rect"].height 
-        
-        prev_bbox_y1 = 0.0 
-
-        blocks = sorted(page.get("blocks", []), key=lambda b: (b.get("bbox", (0,0,0,0))[1], b.get("bbox", (0,0,0,0))[0]))
-
-        for block in blocks:
-            if block.get("type") == 0: 
-                lines = sorted(block.get("lines", []), key=lambda l: l.get("bbox", (0,0,0,0))[1])
-                
-                for line in lines:
-                    if not line.get("spans"):
-                        continue
-
-                    line_text = "".join([span["text"] for span in line["spans"]]).strip()
-                    if not line_text:
-                        continue
-
-                    dominant_font_size = 0
-                    if line["spans"]:
-                        font_sizes = [round(s["size"], 1) for s in line["spans"]]
-                        if font_sizes:
-                            dominant_font_size = Counter(font_sizes).most_common(1)[0][0]
-
-                    is_line_bold = any(is_bold(span["font"]) for span in line["spans"])
-                    is_line_italic = any(is_italic(span["font"]) for span in line["spans"])
-                    
-                    first_span_font_name = line["spans"][0]["font"] if line["spans"] else ""
-                    
-                    font_color = line["spans"][0].get("color", 0) if line["spans"] else 0
-
-                    line_bbox = fitz.Rect(line["bbox"])
-
-                    current_line_y0 = line_bbox.y0
-                    space_above = current_line_y0 - prev_bbox_y1 if prev_bbox_y1 > 0 else 0
-                    
-                    feature_vector = {
-                        "text": line_text,
-                        "page_number": page_number,
-                        "bbox": line_bbox,
-                        "font_size": dominant_font_size,
-                        "font_name": first_span_font_name,
-                        "font_color": font_color,
-                        "is_bold": is_line_bold,
-                        "is_italic": is_line_italic,
-                        "is_all_caps": line_text.isupper() and any(c.isalpha() for c in line_text),
-                        "starts_with_pattern": starts_with_numbering_or_bullet(line_text),
-                        "text_length": len(line_text),
-                        "word_count": len(line_text.split()),
-                        "is_centered": is_centered(line_bbox, page_width),
-                        "space_above": space_above,
-                        "x0": line_bbox.x0,
-                        "y0": line_bbox.y0,
-                        "page_height": page_height,
-                        "block_id": block.get("number")
-                    }
-                    all_lines_features.append(feature_vector)
-                    prev_bbox_y1 = line_bbox.y1
-    
-    return all_lines_features
\ No newline at end of file
+    return list(itertools.chain.from_iterable(map(_features_for_page, pages_data)))
\ No newline at end of file
@@ -1,13 +1,12 @@
 import csv
 import os
-from collections import defaultdict, Counter
 
 def log_font_styles(feature_lines: list, output_dir: str, filename_prefix: str = "font_styles_report"):
     """
     Logs unique font styles (size, name, bold, italic, centered) and their character counts found in the document.
     This helps in understanding the document's typography and can be a "professional/debuggable" WOW factor.
     """
-    font_style_data = defaultdict(lambda: {'char_count': 0, 'line_count': 0, 'sample_text': []})
+    font_style_data = {}
     
     for line in feature_lines:
         style_key = (
@@ -19,34 +18,32 @@ def log_font_styles(feature_lines: list, output_dir: str, filename_prefix: str =
             round(line["x0"], 0),
             line["font_color"]
         )
-        font_style_data[style_key]['char_count'] += line["text_length"] # Count by characters for dominance
-        font_style_data[style_key]['line_count'] += 1
-        if len(font_style_data[style_key]['sample_text']) < 5: # Store a few samples
-            font_style_data[style_key]['sample_text'].append(line["text"][:70].replace('\n', ' ') + "..." if len(line["text"]) > 70 else line["text"].replace('\n', ' '))
+        style = font_style_data.get(style_key)
+        if style is None:
+            style = font_style_data[style_key] = {'char_count': 0, 'line_count': 0, 'sample_text': []}
+        style['char_count'] += line["text_length"] # Count by characters for dominance
+        style['line_count'] += 1
+        samples = style['sample_text']
+        if len(samples) < 5: # Store a few samples
+            text = line["text"]
+            sample = text[:70] + "..." if len(text) > 70 else text
+            samples.append(sample.replace('\n', ' '))
 
     output_path = os.path.join(output_dir, f"{filename_prefix}.csv")
     
     try:
-        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
+        with open(output_path, 'w', newline='', encoding='utf-8', buffering=1 << 16) as csvfile:
             fieldnames = ['Font_Size', 'Font_Name', 'Is_Bold', 'Is_Italic', 'Is_Centered', 'X_Position_Approx', 'Font_Color', 'Total_Chars', 'Total_Lines', 'Sample_Text_Lines']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+            writer = csv.writer(csvfile)
+            writer.writerow(fieldnames)
         
             sorted_styles = sorted(font_style_data.items(), key=lambda item: (item[0][0], item[0][1], item[0][2]), reverse=True)
 
-            for style_key, data in sorted_styles:
-                writer.writerow({
-                    'Font_Size': style_key[0],
-                    'Font_Name': style_key[1],
-                    'Is_Bold': style_key[2],
-                    'Is_Italic': style_key[3],
-                    'Is_Centered': style_key[4],
-                    'X_Position_Approx': style_key[5],
-                    'Font_Color': style_key[6], 
-                    'Total_Chars': data['char_count'],
-                    'Total_Lines': data['line_count'],
-                    'Sample_Text_Lines': " | ".join(data['sample_text'])
-                })
+            # Rows follow the fieldnames order: the style key, then its aggregates
+            writer.writerows(
+                (*style_key, data['char_count'], data['line_count'], " | ".join(data['sample_text']))
+                for style_key, data in sorted_styles
+            )
         print(f"Logged font styles to: {output_path}")
     except Exception as e:
         print(f"Error logging font styles: {e}")
\ No newline at end of file
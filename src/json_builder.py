@@ -1,7 +1,16 @@
 import json
+import logging
 import os
 
-def create_json_file(title: str, outline: list, input_filename: str, output_dir: str):
+try:
+    # Optional fast serializer; the stdlib json module is used when it is missing
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def create_json_file(title: str, outline: list, input_filename: str, output_dir: str) -> bool:
     """
     Constructs the final JSON object in the required format and writes it to a file.
     Args:
@@ -9,6 +18,8 @@ def create_json_file(title: str, outline: list, input_filename: str, output_dir:
         outline: The list of classified headings.
         input_filename: The base name of the input PDF file (e.g., "sample.pdf").
         output_dir: The directory to write the JSON file to.
+    Returns:
+        True if the file was written, False if writing it failed.
     """
     output_data = {
         "title": title,
@@ -20,8 +31,14 @@ def create_json_file(title: str, outline: list, input_filename: str, output_dir:
 
     try:
         os.makedirs(output_dir, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
-        print(f"Successfully created JSON outline: {output_path}")
+        if orjson is not None:
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(output_data, f, indent=2, ensure_ascii=False)
+        logger.debug(f"Successfully created JSON outline: {output_path}")
+        return True
     except Exception as e:
-        print(f"Error writing JSON file for {input_filename}: {e}")
\ No newline at end of file
+        logger.error(f"Error writing JSON file for {input_filename}: {e}")
+        return False
\ No newline at end of file
@@ -2,41 +2,60 @@ import os
 import sys
 import time
 import argparse
+import hashlib
+import logging
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from pdf_parser import process_pdf
 from feature_extractor import extract_features
-from heading_classifier_ml import classify_headings, train_and_save_model
+from heading_classifier_ml import MODEL_FILENAME, classify_headings, train_and_save_model
 from json_builder import create_json_file
 from font_analysis_logger import log_font_styles
 
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = "%(message)s"
+
+# Per-PDF stamps recording which input and model produced the JSON next to them
+CACHE_DIRNAME = ".cache"
+
+def _iter_pdfs(input_dir: str):
+    """Yields the names of the PDF files in input_dir, straight from the directory scan."""
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(".pdf"):
+                yield entry.name
+
 def create_dataset_mode(input_dir: str, dataset_dir: str):
     """
     Processes all PDFs in the input directory to create a single, comprehensive
     CSV file with all extracted features, ready for labeling.
     """
-    print("--- Running in Dataset Creation Mode ---")
-    pdf_files = [f for f in os.listdir(input_dir) if f.lower().endswith(".pdf")]
+    logger.info("--- Running in Dataset Creation Mode ---")
+    pdf_files = list(_iter_pdfs(input_dir))
     if not pdf_files:
-        print(f"No PDF files found in '{input_dir}'.")
+        logger.info(f"No PDF files found in '{input_dir}'.")
         return
 
     all_features_list = []
-    print(f"Found {len(pdf_files)} PDF(s) to process for dataset creation.")
+    logger.info(f"Found {len(pdf_files)} PDF(s) to process for dataset creation.")
 
     for pdf_filename in pdf_files:
         file_path = os.path.join(input_dir, pdf_filename)
-        print(f"  - Extracting features from '{pdf_filename}'...")
-        pages_data = process_pdf(file_path)
-        if not pages_data:
+        try:
+            pages_data = list(process_pdf(file_path))
+        except Exception:
+            # Already logged by process_pdf; a partly parsed document is left out
             continue
         current_doc_features = extract_features(pages_data)
+        logger.info(f"  - '{pdf_filename}': pages={len(pages_data)}, features={len(current_doc_features)}")
         for feature in current_doc_features:
             feature['source_filename'] = pdf_filename
         all_features_list.extend(current_doc_features)
 
     if not all_features_list:
-        print("No features were extracted from any PDF files.")
+        logger.info("No features were extracted from any PDF files.")
         return
 
     df = pd.DataFrame(all_features_list)
@@ -46,41 +65,153 @@ def create_dataset_mode(input_dir: str, dataset_dir: str):
     dataset_path = os.path.join(dataset_dir, 'pdf_analyzer.csv')
     df.to_csv(dataset_path, index=False, encoding='utf-8')
 
-    print(f"\nSuccessfully created dataset with {len(df)} rows.")
-    print(f"Dataset saved to: '{dataset_path}'")
-    print("Next step: Open this CSV file and fill in the 'level' column with labels (e.g., Title, H1, Body).")
+    logger.info(f"\nSuccessfully created dataset with {len(df)} rows.")
+    logger.info(f"Dataset saved to: '{dataset_path}'")
+    logger.info("Next step: Open this CSV file and fill in the 'level' column with labels (e.g., Title, H1, Body).")
 
-def classify_mode(input_dir: str, output_dir: str, model_dir: str):
+def _init_worker(log_level: int = logging.INFO):
+    """
+    Configures logging when a worker process starts. The heading model is
+    loaded (and cached) by the first classify_headings call, so workers
+    whose PDFs are all up to date never load it.
+    """
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+
+def _tally_pages(pages, page_numbers: list):
+    """Passes the parser's pages through unchanged, recording each page number as it goes by."""
+    for page in pages:
+        page_numbers.append(page["page_number"])
+        yield page
+
+def _file_stat_key(path: str) -> str:
+    """Cheap identity of a file: modification time and size, or '' if it cannot be read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+def _content_digest(path: str) -> str:
+    """BLAKE2b digest of a file's bytes, read in 1 MiB chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _write_stamp(stamp_path: str, pdf_stat: str, pdf_digest: str, model_stat: str):
+    os.makedirs(os.path.dirname(stamp_path), exist_ok=True)
+    with open(stamp_path, 'w', encoding='utf-8') as f:
+        f.write(f"{pdf_stat}\n{pdf_digest}\n{model_stat}\n")
+
+def _is_up_to_date(file_path: str, json_path: str, stamp_path: str, model_stat: str) -> bool:
+    """
+    True when json_path was produced from these exact PDF bytes by the current model.
+    An unchanged mtime and size are trusted as-is; otherwise the content is hashed,
+    so a touched but identical PDF is still skipped (and its stamp refreshed).
+    """
+    if not os.path.exists(json_path):
+        return False
+    try:
+        with open(stamp_path, encoding='utf-8') as f:
+            stamped_stat, stamped_digest, stamped_model = f.read().split("\n")[:3]
+    except (OSError, ValueError):
+        return False
+
+    if stamped_model != model_stat:
+        return False
+    pdf_stat = _file_stat_key(file_path)
+    if not pdf_stat:
+        return False
+    if stamped_stat == pdf_stat:
+        return True
+    try:
+        if stamped_digest != _content_digest(file_path):
+            return False
+    except OSError:
+        return False
+    _write_stamp(stamp_path, pdf_stat, stamped_digest, model_stat)
+    return True
+
+def _process_one(pdf_filename: str, input_dir: str, output_dir: str, model_dir: str, force: bool = False):
+    """
+    Runs the full parse -> features -> classify -> JSON pipeline for one PDF.
+    Module-level so it can be shipped to worker processes; returns the
+    filename, a one-line status and its processing time, which the parent
+    logs as a single message. PDFs whose JSON is already up to date with
+    their content and the current model are skipped unless force is set.
+    """
+    start_time = time.time()
+    file_path = os.path.join(input_dir, pdf_filename)
+    json_path = os.path.join(output_dir, f"{os.path.splitext(pdf_filename)[0]}.json")
+    stamp_path = os.path.join(output_dir, CACHE_DIRNAME, f"{pdf_filename}.hash")
+    model_stat = _file_stat_key(os.path.join(model_dir, MODEL_FILENAME))
+
+    if not force and _is_up_to_date(file_path, json_path, stamp_path, model_stat):
+        return pdf_filename, "up to date, skipped", time.time() - start_time
+
+    # Fingerprint before parsing, so a PDF rewritten mid-run is not stamped as current.
+    # An unreadable PDF is left to the parser to report and is never stamped.
+    pdf_stat = _file_stat_key(file_path)
+    try:
+        pdf_digest = _content_digest(file_path)
+    except OSError:
+        pdf_digest = ""
+
+    # Pages stream from the parser straight into feature extraction
+    page_numbers = []
+    try:
+        current_doc_features = extract_features(_tally_pages(process_pdf(file_path), page_numbers))
+        parsed = True
+    except Exception:
+        # Already logged by process_pdf. As before streaming, a document that fails
+        # to parse gets an empty outline, and it is never stamped as up to date.
+        current_doc_features, parsed = [], False
+    if not current_doc_features:
+        title, outline = "", []
+    else:
+        title, outline = classify_headings(current_doc_features, model_dir)
+    # A failed write may leave an older JSON behind, which must not be stamped as current
+    written = create_json_file(title, outline, pdf_filename, output_dir)
+    if written and parsed and model_stat and pdf_stat and pdf_digest:
+        _write_stamp(stamp_path, pdf_stat, pdf_digest, model_stat)
+
+    status = f"pages={len(page_numbers)}, features={len(current_doc_features)}, headings={len(outline)}"
+    if not parsed:
+        status += ", parse failed"
+    if not written:
+        status += ", JSON write failed"
+    return pdf_filename, status, time.time() - start_time
+
+def classify_mode(input_dir: str, output_dir: str, model_dir: str, force: bool = False):
     """
     Default mode: Orchestrates the PDF outline extraction process using a pre-trained ML model.
+    PDFs are independent, so each one is processed in its own worker process.
     """
-    print("--- Running in Classification Mode ---")
-    pdf_files = [f for f in os.listdir(input_dir) if f.lower().endswith(".pdf")]
+    logger.info("--- Running in Classification Mode ---")
+    # Listed up front so the pool is never larger than the batch: with fork,
+    # ProcessPoolExecutor starts every worker on the first submit.
+    pdf_files = list(_iter_pdfs(input_dir))
     if not pdf_files:
-        print(f"No PDF files found in '{input_dir}'.")
+        logger.info(f"No PDF files found in '{input_dir}'.")
         return
 
-    print(f"Found {len(pdf_files)} PDF(s) to process.")
-    for pdf_filename in pdf_files:
-        start_time = time.time()
-        file_path = os.path.join(input_dir, pdf_filename)
-        print(f"\n--- Processing '{pdf_filename}' ---")
-
-        pages_data = process_pdf(file_path)
-        if not pages_data:
-            create_json_file("", [], pdf_filename, output_dir)
-            continue
-
-        current_doc_features = extract_features(pages_data)
-        if not current_doc_features:
-            create_json_file("", [], pdf_filename, output_dir)
-            continue
-
-        title, outline = classify_headings(current_doc_features, model_dir)
-        create_json_file(title, outline, pdf_filename, output_dir)
-
-        processing_time = time.time() - start_time
-        print(f"Finished processing '{pdf_filename}' in {processing_time:.2f} seconds.")
+    logger.info(f"Found {len(pdf_files)} PDF(s) to process.")
+    max_workers = min(os.cpu_count() or 1, len(pdf_files))
+    initargs = (logging.getLogger().getEffectiveLevel(),)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=initargs) as executor:
+        futures = {
+            executor.submit(_process_one, pdf_filename, input_dir, output_dir, model_dir, force): pdf_filename
+            for pdf_filename in pdf_files
+        }
+        for future in as_completed(futures):
+            # One failing PDF must not abort the rest of the batch
+            try:
+                pdf_filename, status, processing_time = future.result()
+            except Exception as e:
+                logger.error(f"'{futures[future]}': failed: {e}")
+                continue
+            logger.info(f"'{pdf_filename}': {status}, t={processing_time:.2f}s")
 
 def main():
     parser = argparse.ArgumentParser(description="PDF Outline Extraction Tool")
@@ -91,7 +222,18 @@ def main():
         default='classify',
         help="Operation mode: 'classify' to generate JSON outlines, 'dataset' to create a CSV for training."
     )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help="Reprocess every PDF, even those whose JSON output is already up to date."
+    )
+    parser.add_argument(
+        '--quiet',
+        action='store_true',
+        help="Only log warnings and errors, suppressing the progress lines of either mode."
+    )
     args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format=LOG_FORMAT)
 
     current_dir = os.getcwd()
     input_dir = os.path.join(current_dir, "input")
@@ -100,14 +242,14 @@ def main():
     dataset_dir = os.path.join(current_dir, "dataset")
 
     if not os.path.exists(input_dir):
-        print(f"Error: Input directory not found. Please place PDFs in '{input_dir}'.")
+        logger.error(f"Error: Input directory not found. Please place PDFs in '{input_dir}'.")
         sys.exit(1)
 
     if args.mode == 'dataset':
         create_dataset_mode(input_dir, dataset_dir)
     else:
         os.makedirs(output_dir, exist_ok=True)
-        classify_mode(input_dir, output_dir, model_dir)
+        classify_mode(input_dir, output_dir, model_dir, force=args.force)
 
 if __name__ == "__main__":
     main()
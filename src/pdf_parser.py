@@ -1,72 +1,103 @@
 import fitz 
 import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def _close_merged_line(line: dict, group_bboxes: list):
+    """
+    Finalizes a line that absorbed the lines in group_bboxes: its bbox becomes
+    their union and its spans are put back in horizontal (x0) order.
+    """
+    if len(group_bboxes) < 2:
+        return
+    x0s, y0s, x1s, y1s = zip(*group_bboxes)
+    line["bbox"] = (min(x0s), min(y0s), max(x1s), max(y1s))
+    line["spans"].sort(key=lambda s: s["bbox"][0])
 
 def process_pdf(file_path: str):
     """
     Opens a PDF and extracts structured text data, intelligently merging text lines
     and excluding content from tables from the entire document.
+    Pages are yielded one at a time as they are parsed, so callers never hold
+    the whole document's block tree in memory unless they collect it.
+    A parse error is logged and re-raised, so callers can tell a truncated
+    document from a complete one.
     """
     try:
-        doc = fitz.open(file_path)
-        print(f"Processing '{os.path.basename(file_path)}' with {doc.page_count} pages.")
-        
-        all_pages_data = []
-        for page_num, page in enumerate(doc):
+        with fitz.open(file_path) as doc:
+            logger.debug(f"Processing '{os.path.basename(file_path)}' with {doc.page_count} pages.")
+            
+            for page_num, page in enumerate(doc):
 
-            # 1. Find table areas to exclude them from text extraction
-            table_bboxes = [fitz.Rect(table.bbox) for table in page.find_tables()]
+                # 1. Find table areas to exclude them from text extraction, as an (N, 4) array
+                table_bboxes = np.asarray([table.bbox for table in page.find_tables()], dtype=float).reshape(-1, 4)
 
-            # 2. Get the raw text dictionary from the page
-            page_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT)
+                # 2. Get the raw text dictionary from the page
+                page_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_DICT)
             
-            # 3. Filter out any text blocks that fall within a detected table
-            filtered_blocks = []
-            for block in page_dict.get("blocks", []):
-                block_bbox = fitz.Rect(block["bbox"])
-                is_in_table = any(block_bbox.intersects(table_bbox) for table_bbox in table_bboxes)
-                if not is_in_table:
-                    filtered_blocks.append(block)
+                # 3. Keep only text blocks, dropping any that fall within a detected table
+                filtered_blocks = [block for block in page_dict.get("blocks", []) if block.get("type") == 0]
+                if filtered_blocks and len(table_bboxes):
+                    # Pairwise strict AABB overlap of every block against every table at once.
+                    # Like Rect.intersects, an empty (zero-width or zero-height) rect overlaps nothing.
+                    block_bboxes = np.asarray([block["bbox"] for block in filtered_blocks], dtype=float)
+                    block_nonempty = (block_bboxes[:, 2] > block_bboxes[:, 0]) & (block_bboxes[:, 3] > block_bboxes[:, 1])
+                    table_nonempty = (table_bboxes[:, 2] > table_bboxes[:, 0]) & (table_bboxes[:, 3] > table_bboxes[:, 1])
+                    overlaps = (
+                        (block_bboxes[:, None, 0] < table_bboxes[None, :, 2])
+                        & (block_bboxes[:, None, 2] > table_bboxes[None, :, 0])
+                        & (block_bboxes[:, None, 1] < table_bboxes[None, :, 3])
+                        & (block_bboxes[:, None, 3] > table_bboxes[None, :, 1])
+                        & block_nonempty[:, None]
+                        & table_nonempty[None, :]
+                    )
+                    is_in_table = overlaps.any(axis=1)
+                    filtered_blocks = [block for block, in_table in zip(filtered_blocks, is_in_table) if not in_table]
             
-            # 4. Perform line merging within each remaining block
-            for block in filtered_blocks:
-                if "lines" not in block or not block["lines"]:
-                    continue
+                # 4. Perform line merging within each remaining block
+                for block in filtered_blocks:
+                    lines = block.get("lines")
+                    if not lines or len(lines) < 2:
+                        continue
 
-                merged_lines = []
-                if not block["lines"]:
-                    continue
-                current_line = block["lines"][0]
+                    # Until a merge happens, each line is compared with its raw predecessor,
+                    # so if no adjacent pair shares a row nothing in the block can merge.
+                    if not any(abs(prev["bbox"][1] - line["bbox"][1]) < 2 for prev, line in zip(lines, lines[1:])):
+                        continue
 
-                for i in range(1, len(block["lines"])):
-                    next_line = block["lines"][i]
-                    
-                    # Check if the next line is on the same vertical level (y0)
-                    if abs(current_line["bbox"][1] - next_line["bbox"][1]) < 2: # 2-point tolerance
-                        # Merge spans and update bounding box
-                        current_line["spans"].extend(next_line["spans"])
-                        current_line["bbox"] = (
-                            min(current_line["bbox"][0], next_line["bbox"][0]),
-                            min(current_line["bbox"][1], next_line["bbox"][1]),
-                            max(current_line["bbox"][2], next_line["bbox"][2]),
-                            max(current_line["bbox"][3], next_line["bbox"][3]),
-                        )
-                        # Sort spans by horizontal position (x0) after merging
-                        current_line["spans"].sort(key=lambda s: s["bbox"][0])
-                    else:
-                        merged_lines.append(current_line)
-                        current_line = next_line
-                
-                merged_lines.append(current_line)
-                block["lines"] = merged_lines
+                    merged_lines = []
+                    current_line = lines[0]
+                    # Running top edge of the current group; lines are compared against it
+                    current_y0 = current_line["bbox"][1]
+                    group_bboxes = [current_line["bbox"]]
 
-            # 5. Re-assemble the page dictionary with the processed blocks
-            page_dict["blocks"] = filtered_blocks
-            page_dict["page_number"] = page_num + 1
-            page_dict["page_rect"] = page.rect
-            all_pages_data.append(page_dict)
-            
-        doc.close()
-        return all_pages_data
+                    for next_line in lines[1:]:
+                        next_bbox = next_line["bbox"]
+                        # Check if the next line is on the same vertical level (y0)
+                        if abs(current_y0 - next_bbox[1]) < 2: # 2-point tolerance
+                            # Merge spans; the bounding box is settled when the group closes
+                            current_line["spans"].extend(next_line["spans"])
+                            group_bboxes.append(next_bbox)
+                            if next_bbox[1] < current_y0:
+                                current_y0 = next_bbox[1]
+                        else:
+                            _close_merged_line(current_line, group_bboxes)
+                            merged_lines.append(current_line)
+                            current_line = next_line
+                            current_y0 = next_bbox[1]
+                            group_bboxes = [next_bbox]
+
+                    _close_merged_line(current_line, group_bboxes)
+                    merged_lines.append(current_line)
+                    block["lines"] = merged_lines
+
+                # 5. Re-assemble the page dictionary with the processed blocks
+                page_dict["blocks"] = filtered_blocks
+                page_dict["page_number"] = page_num + 1
+                page_dict["page_rect"] = page.rect
+                yield page_dict
     except Exception as e:
-        print(f"Error processing PDF file {os.path.basename(file_path)}: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"Error processing PDF file {os.path.basename(file_path)}: {e}")
+        raise
\ No newline at end of file